@@ -0,0 +1,211 @@
+import ast
+import io
+import re
+import tokenize
+import argparse
+import pandas as pd
+from pathlib import Path
+
+# Fenced code block; fences only count at the start of a line, so inline ``` in
+# prose or inside a string literal is ignored. The closing fence is optional so
+# responses truncated at max_new_tokens still yield their last block
+CODE_BLOCK_PATTERN = re.compile(
+    r"^[ \t]*```[ \t]*([\w+-]*)[^\n]*\n(.*?)(?:^[ \t]*```[ \t]*$|\Z)",
+    re.MULTILINE | re.DOTALL
+)
+PYTHON_LANGUAGES = {"python", "python3", "py"}
+
+# Tokens that carry no content for scoring
+SKIPPED_TOKEN_TYPES = {
+    tokenize.COMMENT,
+    tokenize.NL,
+    tokenize.NEWLINE,
+    tokenize.INDENT,
+    tokenize.DEDENT,
+    tokenize.ENCODING,
+    tokenize.ENDMARKER,
+}
+
+# How much real code a parsed block contains, used to rank candidate blocks
+NO_CODE, STATEMENTS, DEFINITIONS = 0, 1, 2
+
+def parse_code(code):
+    """
+    Parse code as Python, returning the AST or None if it does not parse
+    """
+    if not isinstance(code, str):
+        return None
+    try:
+        return ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+
+def is_valid_python(code):
+    """
+    Check whether code parses as Python
+    """
+    return parse_code(code) is not None
+
+def code_substance(tree):
+    """
+    Rank how much real code a parsed block contains
+    - DEFINITIONS: defines a function or class
+    - STATEMENTS: has a statement other than a bare name/constant or an annotation,
+      so LeetCode examples like "Input: nums = [2,7]" / "Output: 3" don't count
+    - NO_CODE: anything else, including text that does not parse
+    """
+    if tree is None:
+        return NO_CODE
+
+    if any(isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) for node in ast.walk(tree)):
+        return DEFINITIONS
+
+    for node in tree.body:
+        if isinstance(node, ast.AnnAssign):
+            continue
+        if isinstance(node, ast.Expr) and isinstance(node.value, (ast.Name, ast.Constant)):
+            continue
+        return STATEMENTS
+
+    return NO_CODE
+
+def extract_code(response):
+    """
+    Extract the Python code from a model response, returning (code, is_valid)
+    - is_valid is True when the code parses and contains real code (see code_substance)
+    - Among ```python and unlabelled fenced blocks that parse, picks the one with the
+      most substance (definitions over plain statements), then labelled over
+      unlabelled, then the latest
+    - Falls back to the last ```python block even if it does not parse (e.g. truncated code)
+    - Without fences, uses the whole response if it contains real Python code
+    - Returns (None, False) if no code could be found
+    """
+    if not isinstance(response, str):
+        return None, False
+
+    best_key, best_code = None, None
+    last_python_block = None
+    for position, match in enumerate(CODE_BLOCK_PATTERN.finditer(response)):
+        language = match.group(1).lower()
+        is_labelled = language in PYTHON_LANGUAGES
+        if not is_labelled and language != "":
+            continue
+
+        block = match.group(2).strip()
+        if not block:
+            continue
+        if is_labelled:
+            last_python_block = block
+
+        substance = code_substance(parse_code(block))
+        if substance == NO_CODE:
+            continue
+
+        key = (substance, is_labelled, position)
+        if best_key is None or key > best_key:
+            best_key, best_code = key, block
+
+    if best_code is not None:
+        return best_code, True
+
+    if last_python_block is not None:
+        return last_python_block, False
+
+    if "```" not in response:
+        code = response.strip()
+        if code_substance(parse_code(code)) != NO_CODE:
+            return code, True
+
+    return None, False
+
+def code_tokens(code):
+    """
+    Tokenize code for scoring with Python's tokenizer
+    - Drops comments, blank lines and indentation tokens
+    - Keeps strings intact, so '#' inside a string is not treated as a comment
+    - For code the tokenizer cannot finish, keeps the tokens read before the error
+    """
+    if not isinstance(code, str):
+        return []
+
+    tokens = []
+    token_stream = tokenize.generate_tokens(io.StringIO(code).readline)
+    while True:
+        try:
+            token = next(token_stream)
+        except (StopIteration, tokenize.TokenError, SyntaxError):
+            break
+        if token.type not in SKIPPED_TOKEN_TYPES and token.string.strip():
+            tokens.append(token.string)
+    return tokens
+
+def extract_responses(df, response_column='model_response', keep_unextracted=False):
+    """
+    Extract, validate and tokenize the code of every row of df in one pass
+    - Returns a copy of df with generated_code, is_valid_code and code_tokens columns
+    - If keep_unextracted is True, rows without extractable code are tokenized
+      as-is (useful for reference solutions stored as plain code)
+    """
+    generated_code, is_valid_code, tokens = [], [], []
+    for response in df[response_column]:
+        code, is_valid = extract_code(response)
+        if code is None and keep_unextracted:
+            code = response
+        generated_code.append(code)
+        is_valid_code.append(is_valid)
+        tokens.append(code_tokens(code))
+
+    extracted_df = df.copy()
+    extracted_df['generated_code'] = generated_code
+    extracted_df['is_valid_code'] = is_valid_code
+    extracted_df['code_tokens'] = tokens
+    return extracted_df
+
+def process_predictions(predictions_file, output_file=None):
+    """
+    Extract and normalize the code of every response in a predictions file
+    - Adds generated_code, is_valid_code and normalized_code columns
+    - normalized_code is the space-joined token stream used for scoring
+    """
+    try:
+        predictions_df = extract_responses(pd.read_csv(predictions_file))
+        predictions_df['normalized_code'] = predictions_df['code_tokens'].str.join(' ')
+        predictions_df = predictions_df.drop(columns=['code_tokens'])
+
+        if output_file is not None:
+            Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+            predictions_df.to_csv(output_file, index=False)
+            print(f"Extracted code saved to: {output_file}")
+
+        valid_count = int(predictions_df['is_valid_code'].sum())
+        print(f"Valid Python code in {valid_count}/{len(predictions_df)} responses")
+
+        return predictions_df
+
+    except Exception as e:
+        print(f"Error processing predictions: {e}")
+        return None
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract and normalize code from model responses")
+
+    parser.add_argument(
+        "--predictions_file",
+        default="model_results/predictions.csv",
+        help="Predictions CSV with a model_response column"
+    )
+
+    parser.add_argument(
+        "--output_file",
+        default="model_results/extracted_code.csv",
+        help="Where to write the predictions with extracted code"
+    )
+
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    process_predictions(args.predictions_file, args.output_file)
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,26 @@
 import pandas as pd
 import numpy as np
 from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
-from nltk.tokenize import word_tokenize
-import nltk
+import sys
+import argparse
 from pathlib import Path
+from data.sharding import parse_shard, parse_num_shards, select_shard, shard_path, merge_shards
+from data.code_extraction import extract_responses, code_tokens
 
-def download_nltk_data():
-    """Download required NLTK data"""
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        nltk.download('punkt')
+SMOOTHING = SmoothingFunction().method1
 
 def preprocess_code(code):
     """
     Preprocess code for BLEU score calculation
-    - Remove comments
-    - Remove extra whitespace
-    - Tokenize
+    - Tokenize with Python's tokenizer
+    - Remove comments, blank lines and indentation
     """
-    if not isinstance(code, str):
-        return []
-    
-    # Remove comments
-    lines = code.split('\n')
-    cleaned_lines = []
-    for line in lines:
-        # Remove inline comments
-        if '#' in line:
-            line = line.split('#')[0]
-        # Remove empty lines and whitespace
-        line = line.strip()
-        if line:
-            cleaned_lines.append(line)
-    
-    # Join and tokenize
-    code = ' '.join(cleaned_lines)
-    return word_tokenize(code)
+    return code_tokens(code)
 
-def calculate_bleu_score(reference, candidate):
+def bleu_from_tokens(reference_tokens, candidate_tokens):
     """
-    Calculate BLEU score between reference and candidate code
+    Calculate BLEU score between already preprocessed reference and candidate tokens
     """
-    reference_tokens = preprocess_code(reference)
-    candidate_tokens = preprocess_code(candidate)
-    
     if not reference_tokens or not candidate_tokens:
         return 0.0
     
@@ -52,66 +28,87 @@ def calculate_bleu_score(reference, candidate):
     references = [reference_tokens]
     
     # Calculate BLEU score
-    smoothing = SmoothingFunction().method1
-    return sentence_bleu(references, candidate_tokens, smoothing_function=smoothing)
+    return sentence_bleu(references, candidate_tokens, smoothing_function=SMOOTHING)
+
+def calculate_bleu_score(reference, candidate):
+    """
+    Calculate BLEU score between reference and candidate code
+    """
+    return bleu_from_tokens(preprocess_code(reference), preprocess_code(candidate))
+
+def compute_statistics(eval_df):
+    """
+    Calculate summary statistics over per-problem BLEU scores
+    """
+    return {
+        'mean_bleu': eval_df['bleu_score'].mean(),
+        'median_bleu': eval_df['bleu_score'].median(),
+        'std_bleu': eval_df['bleu_score'].std(),
+        'min_bleu': eval_df['bleu_score'].min(),
+        'max_bleu': eval_df['bleu_score'].max()
+    }
+
+def print_statistics(stats):
+    """
+    Print summary statistics
+    """
+    print("\nEvaluation Results:")
+    print(f"Mean BLEU Score: {stats['mean_bleu']:.4f}")
+    print(f"Median BLEU Score: {stats['median_bleu']:.4f}")
+    print(f"Standard Deviation: {stats['std_bleu']:.4f}")
+    print(f"Min BLEU Score: {stats['min_bleu']:.4f}")
+    print(f"Max BLEU Score: {stats['max_bleu']:.4f}")
 
-def evaluate_predictions(predictions_file, test_file, output_file="model_results/evaluation_results.csv"):
+def evaluate_predictions(predictions_file, test_file, output_file="model_results/evaluation_results.csv", shard=None):
     """
     Evaluate model predictions against test set
+    - If shard is given as (index, num_shards), only that shard's problems are scored
+      and the per-problem results are written to the shard's output file
     """
     try:
-        # Download NLTK data if needed
-        download_nltk_data()
-        
         # Load predictions and test data
         predictions_df = pd.read_csv(predictions_file)
         test_df = pd.read_csv(test_file)
         
+        # Restrict to this worker's shard
+        if shard is not None:
+            predictions_df = select_shard(predictions_df, shard, id_column='problem_id')
+            output_file = shard_path(output_file, shard)
+        
         # Create results directory if it doesn't exist
         Path(output_file).parent.mkdir(parents=True, exist_ok=True)
         
-        # Calculate BLEU scores
+        # Extract, validate and tokenize references and responses in bulk
+        # Assuming 'solution' column exists; plain-code references are used as-is
+        test_df = test_df[test_df['id'].isin(predictions_df['problem_id'])]
+        reference_df = extract_responses(test_df, response_column='solution', keep_unextracted=True)
+        reference_tokens = dict(zip(reference_df['id'], reference_df['code_tokens']))
+        predictions_df = extract_responses(predictions_df)
+        
+        # Calculate BLEU scores on the code extracted from each response
         results = []
-        for idx, row in predictions_df.iterrows():
-            problem_id = row['problem_id']
-            model_response = row['model_response']
-            
-            # Find corresponding test problem
-            test_problem = test_df[test_df['id'] == problem_id].iloc[0]
-            reference_solution = test_problem['solution']  # Assuming 'solution' column exists
-            
-            # Calculate BLEU score
-            bleu_score = calculate_bleu_score(reference_solution, model_response)
-            
+        for problem_id, prediction_tokens, is_valid_code in zip(
+            predictions_df['problem_id'], predictions_df['code_tokens'], predictions_df['is_valid_code']
+        ):
             results.append({
                 'problem_id': problem_id,
-                'bleu_score': bleu_score,
-                'reference_length': len(preprocess_code(reference_solution)),
-                'prediction_length': len(preprocess_code(model_response))
+                'bleu_score': bleu_from_tokens(reference_tokens[problem_id], prediction_tokens),
+                'reference_length': len(reference_tokens[problem_id]),
+                'prediction_length': len(prediction_tokens),
+                'is_valid_code': is_valid_code
             })
         
         # Create evaluation results DataFrame
-        eval_df = pd.DataFrame(results)
+        eval_df = pd.DataFrame(results, columns=['problem_id', 'bleu_score', 'reference_length', 'prediction_length', 'is_valid_code'])
         
         # Calculate statistics
-        stats = {
-            'mean_bleu': eval_df['bleu_score'].mean(),
-            'median_bleu': eval_df['bleu_score'].median(),
-            'std_bleu': eval_df['bleu_score'].std(),
-            'min_bleu': eval_df['bleu_score'].min(),
-            'max_bleu': eval_df['bleu_score'].max()
-        }
+        stats = compute_statistics(eval_df)
         
         # Save detailed results
         eval_df.to_csv(output_file, index=False)
         
         # Print statistics
-        print("\nEvaluation Results:")
-        print(f"Mean BLEU Score: {stats['mean_bleu']:.4f}")
-        print(f"Median BLEU Score: {stats['median_bleu']:.4f}")
-        print(f"Standard Deviation: {stats['std_bleu']:.4f}")
-        print(f"Min BLEU Score: {stats['min_bleu']:.4f}")
-        print(f"Max BLEU Score: {stats['max_bleu']:.4f}")
+        print_statistics(stats)
         
         return stats
         
@@ -119,12 +116,66 @@ def evaluate_predictions(predictions_file, test_file, output_file="model_results
         print(f"Error during evaluation: {e}")
         return None
 
+def merge_evaluations(output_file, num_shards):
+    """
+    Merge per-shard evaluation results and compute global statistics
+    - Statistics are recomputed over the merged per-problem scores, so the
+      median and std are exact rather than combined from per-shard summaries
+    """
+    try:
+        eval_df = merge_shards(output_file, num_shards, id_column='problem_id')
+        
+        stats = compute_statistics(eval_df)
+        
+        eval_df.to_csv(output_file, index=False)
+        print(f"Merged {num_shards} shards into: {output_file}")
+        
+        print_statistics(stats)
+        
+        return stats
+        
+    except Exception as e:
+        print(f"Error merging evaluation shards: {e}")
+        return None
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evaluate model predictions with BLEU")
+
+    # A run either processes one shard or merges shard outputs, never both
+    shard_group = parser.add_mutually_exclusive_group()
+
+    shard_group.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        help="Only evaluate shard i of N (0-based), given as 'i/N'"
+    )
+
+    shard_group.add_argument(
+        "--merge",
+        type=parse_num_shards,
+        default=None,
+        metavar="N",
+        help="Merge the outputs of N evaluation shards instead of evaluating"
+    )
+
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+
     predictions_file = "model_results/predictions.csv"
     test_file = "data/processed_data/split_data/test_set.csv"
     output_file = "model_results/evaluation_results.csv"
     
-    evaluate_predictions(predictions_file, test_file, output_file)
+    if args.merge is not None:
+        stats = merge_evaluations(output_file, args.merge)
+    else:
+        stats = evaluate_predictions(predictions_file, test_file, output_file, shard=args.shard)
+    
+    # Exit non-zero so shard launchers can tell a failed worker apart
+    if stats is None:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
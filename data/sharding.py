@@ -0,0 +1,80 @@
+import hashlib
+import argparse
+import pandas as pd
+from pathlib import Path
+
+def parse_shard(spec):
+    """
+    Parse a shard spec of the form "i/N" into (index, num_shards)
+    - index is 0-based, so valid shards of N are 0/N ... (N-1)/N
+    - Raises argparse.ArgumentTypeError so the message reaches the user when used as a type=
+    """
+    try:
+        index, num_shards = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid shard spec '{spec}', expected 'i/N'")
+
+    if num_shards < 1 or not 0 <= index < num_shards:
+        raise argparse.ArgumentTypeError(f"invalid shard spec '{spec}', need 0 <= i < N")
+
+    return index, num_shards
+
+def parse_num_shards(value):
+    """
+    Parse a shard count N for --merge, which must be at least 1
+    """
+    try:
+        num_shards = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid shard count '{value}', expected an integer")
+
+    if num_shards < 1:
+        raise argparse.ArgumentTypeError(f"invalid shard count '{value}', need N >= 1")
+
+    return num_shards
+
+def assign_shard(problem_id, num_shards):
+    """
+    Deterministically assign a problem id to a shard
+    - Uses md5 rather than hash() so every process/node agrees on the assignment
+    """
+    digest = hashlib.md5(str(problem_id).encode('utf-8')).hexdigest()
+    return int(digest, 16) % num_shards
+
+def select_shard(df, shard, id_column='id'):
+    """
+    Keep only the rows of df whose problem id belongs to the given shard
+    """
+    index, num_shards = shard
+    mask = df[id_column].apply(lambda problem_id: assign_shard(problem_id, num_shards) == index)
+    return df[mask]
+
+def shard_path(output_file, shard):
+    """
+    Per-shard output path, e.g. predictions.csv -> predictions.shard-0-of-4.csv
+    """
+    index, num_shards = shard
+    path = Path(output_file)
+    return path.parent / f"{path.stem}.shard-{index}-of-{num_shards}{path.suffix}"
+
+def merge_shards(output_file, num_shards, id_column='problem_id'):
+    """
+    Combine the per-shard CSVs of output_file into a single DataFrame
+    - Fails if a shard is missing or a problem id appears in more than one shard
+    - Rows are sorted by problem id so the merged file does not depend on N
+    """
+    if num_shards < 1:
+        raise ValueError(f"Need at least one shard to merge, got {num_shards}")
+
+    shard_files = [shard_path(output_file, (index, num_shards)) for index in range(num_shards)]
+    missing = [str(f) for f in shard_files if not f.exists()]
+    if missing:
+        raise FileNotFoundError(f"Missing shard outputs: {', '.join(missing)}")
+
+    merged_df = pd.concat([pd.read_csv(f) for f in shard_files], ignore_index=True)
+
+    duplicated = merged_df[id_column][merged_df[id_column].duplicated()]
+    if not duplicated.empty:
+        raise ValueError(f"Problem ids found in more than one shard: {sorted(duplicated.unique())}")
+
+    return merged_df.sort_values(id_column).reset_index(drop=True)
@@ -1,8 +1,11 @@
+import sys
 import requests
 import json
+import argparse
 import pandas as pd
 from tqdm import tqdm
 from data.data_processor import prepare_prompt_with_examples
+from data.sharding import parse_shard, parse_num_shards, select_shard, shard_path, merge_shards
 from pathlib import Path
 
 def get_code_llama_response(prompt, model="codellama:7b-instruct"):
@@ -45,15 +48,22 @@ Please provide a solution in {language} that:
 Solution:"""
     return prompt
 
-def process_test_set(test_file, train_file, output_file="model_results/predictions.csv"):
+def process_test_set(test_file, train_file, output_file="model_results/predictions.csv", shard=None):
     """
     Process the test set and save model predictions
+    - If shard is given as (index, num_shards), only that shard's problems are processed
+      and the predictions are written to the shard's output file
     """
     try:
         # Load train and test data
         train_df = pd.read_csv(train_file)
         test_df = pd.read_csv(test_file)
         
+        # Restrict to this worker's shard
+        if shard is not None:
+            test_df = select_shard(test_df, shard, id_column='id')
+            output_file = shard_path(output_file, shard)
+        
         # Create results directory if it doesn't exist
         Path(output_file).parent.mkdir(parents=True, exist_ok=True)
         
@@ -76,21 +86,69 @@ def process_test_set(test_file, train_file, output_file="model_results/predictio
             })
         
         # Save results
-        results_df = pd.DataFrame(results)
+        results_df = pd.DataFrame(results, columns=['problem_id', 'problem_content', 'model_response'])
         results_df.to_csv(output_file, index=False)
         print(f"\nResults saved to: {output_file}")
+        return results_df
         
     except Exception as e:
         print(f"Error processing test set: {e}")
+        return None
+
+def merge_predictions(output_file, num_shards):
+    """
+    Merge per-shard predictions into a single predictions file
+    """
+    try:
+        results_df = merge_shards(output_file, num_shards, id_column='problem_id')
+        results_df.to_csv(output_file, index=False)
+        print(f"Merged {num_shards} shards into: {output_file}")
+        return results_df
+        
+    except Exception as e:
+        print(f"Error merging prediction shards: {e}")
+        return None
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run CodeLlama over the LeetCode test set")
+
+    # A run either processes one shard or merges shard outputs, never both
+    shard_group = parser.add_mutually_exclusive_group()
+
+    shard_group.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        help="Only process shard i of N (0-based), given as 'i/N'"
+    )
+
+    shard_group.add_argument(
+        "--merge",
+        type=parse_num_shards,
+        default=None,
+        metavar="N",
+        help="Merge the outputs of N inference shards instead of running inference"
+    )
+
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+
     # File paths
     train_file = "data/split_data/train_set.csv"
     test_file = "data/split_data/test_set.csv"
     output_file = "model_results/predictions.csv"
     
-    # Process test set
-    process_test_set(test_file, train_file, output_file)
+    if args.merge is not None:
+        results_df = merge_predictions(output_file, args.merge)
+    else:
+        # Process test set
+        results_df = process_test_set(test_file, train_file, output_file, shard=args.shard)
+    
+    # Exit non-zero so shard launchers can tell a failed worker apart
+    if results_df is None:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
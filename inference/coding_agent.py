@@ -6,6 +6,7 @@ from prompt_templates import (
     NAIVE_TEMPLATE,
     COT_TEMPLATE
 )
+from data.code_extraction import extract_code
 
 model_name = "Qwen/Qwen2.5-Coder-7B-Instruct"
 model = AutoModelForCausalLM.from_pretrained(
@@ -32,11 +33,12 @@ class CodeGenerationAgent:
             print(f"Attempt {attempt}/{self.max_attempts}")
             response = self.generate_code(feedback)
             # Extract the code from the response
-            if "```python" in response and "```" in response:
-                start_idx = response.find("```python") + len("```python")
-                end_idx = response.rfind("```")
-                if start_idx < end_idx:
-                    generated_code = response[start_idx:end_idx].strip()
+            generated_code, _ = extract_code(response)
+            if generated_code is None:
+                feedback = "No Python code block found in your response."
+                self.history.append((response, feedback))
+                print("No code found in response, retrying...\n")
+                continue
             print(f"=== Generated Code (Attempt {attempt}) ===")
             print(generated_code)
             print()
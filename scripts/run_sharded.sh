@@ -0,0 +1,31 @@
+export PYTHONPATH=$(pwd)
+
+# Number of shards; each shard runs as its own local worker process,
+# standing in for one node. On a cluster, run each `--shard i/N` on its own node.
+NUM_SHARDS=${NUM_SHARDS:-4}
+
+# Run one worker per shard and wait on each, failing if any worker fails
+run_shards() {
+    local pids=()
+    for ((i = 0; i < NUM_SHARDS; i++)); do
+        python "$@" --shard "$i/$NUM_SHARDS" &
+        pids+=($!)
+    done
+
+    local status=0
+    for pid in "${pids[@]}"; do
+        wait "$pid" || status=1
+    done
+    return $status
+}
+
+# Remove shard outputs left over from earlier runs so a failed worker
+# cannot be merged with stale results
+rm -f model_results/predictions.shard-*-of-"$NUM_SHARDS".csv \
+      model_results/evaluation_results.shard-*-of-"$NUM_SHARDS".csv
+
+run_shards inference/codellama7b.py || { echo "Inference shard failed, not merging"; exit 1; }
+python inference/codellama7b.py --merge "$NUM_SHARDS" || exit 1
+
+run_shards data/evaluate.py || { echo "Evaluation shard failed, not merging"; exit 1; }
+python data/evaluate.py --merge "$NUM_SHARDS" || exit 1